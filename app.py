@@ -5,13 +5,18 @@ Run with: python app.py [optional_step_file.step]
 
 import sys
 import os
-import json
+import hashlib
+import shutil
 import webbrowser
 import tempfile
+from collections import OrderedDict
 from pathlib import Path
 from threading import Timer
 
-from flask import Flask, render_template, request, jsonify, send_file
+import orjson
+from waitress import serve
+from flask import Flask, Response, render_template, request, jsonify, send_file
+from werkzeug.utils import secure_filename
 
 from step_processor import StepProcessor
 
@@ -20,11 +25,76 @@ app.config['MAX_CONTENT_LENGTH'] = 100 * 1024 * 1024  # 100MB max upload
 
 processor = StepProcessor()
 
-# Store features state server-side
-current_features = {}
+# Recently loaded files: SHA-256 of file bytes -> (StepProcessor, info, directory holding
+# the file the processor has mapped)
+PROCESSOR_CACHE_SIZE = 8
+processor_cache = OrderedDict()
+
+# Store features state server-side, alongside its serialized GET response. POST swaps in
+# a new dict in a single assignment, so concurrent readers never see a partial update.
+features_state = {"features": {}, "json": b'{"features":{}}'}
 upload_dir = tempfile.mkdtemp(prefix="step_labeler_")
 
 
+def json_response(payload, status=200):
+    """Serialize a response with orjson (NumPy arrays are encoded natively)."""
+    body = orjson.dumps(payload, option=orjson.OPT_SERIALIZE_NUMPY)
+    return Response(body, status=status, mimetype='application/json')
+
+
+def file_sha256(filepath):
+    """Hash a file in chunks so large STEP files are never read into memory at once."""
+    digest = hashlib.sha256()
+    with open(filepath, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def load_into_processor(filepath, file_dir):
+    """Make a processor for filepath active, reusing cached results for identical bytes.
+
+    file_dir is the private directory (created under upload_dir) that holds filepath
+    and nothing else; it is deleted once the file is no longer needed (cache hit,
+    failed load, or eviction).
+
+    Returns the load info. Re-uploading a file that was loaded recently skips parsing
+    and metadata extraction, and its mesh stream replays without re-meshing.
+    """
+    global processor
+
+    key = file_sha256(filepath)
+    cached = processor_cache.get(key)
+    if cached is not None:
+        processor_cache.move_to_end(key)
+        processor, info, _ = cached
+        processor.step_path = Path(filepath)  # Export is named after the latest upload
+        # The cached processor maps its own earlier copy, so this one is not needed
+        shutil.rmtree(file_dir, ignore_errors=True)
+        return info
+
+    new_processor = StepProcessor()
+    try:
+        info = new_processor.load_step(filepath)
+    except Exception:
+        new_processor.close()
+        shutil.rmtree(file_dir, ignore_errors=True)
+        raise
+
+    processor_cache[key] = (new_processor, info, file_dir)
+    if len(processor_cache) > PROCESSOR_CACHE_SIZE:
+        _, (evicted, _, evicted_dir) = processor_cache.popitem(last=False)
+        evicted.close()
+        shutil.rmtree(evicted_dir, ignore_errors=True)
+    processor = new_processor
+    return info
+
+
+def sse_event(event, payload):
+    """Format one server-sent event with an orjson-encoded data line."""
+    return b"event: " + event.encode() + b"\ndata: " + orjson.dumps(payload) + b"\n\n"
+
+
 @app.route('/')
 def index():
     return render_template('index.html')
@@ -44,24 +114,32 @@ def upload_step():
     if ext not in ('.step', '.stp'):
         return jsonify({"error": "File must be .step or .stp"}), 400
 
-    # Save uploaded file
-    filepath = os.path.join(upload_dir, file.filename)
-    file.save(filepath)
+    # Never build paths from the client's filename as-is: "../" components would escape
+    # the upload directory (and that directory is later deleted recursively)
+    filename = secure_filename(file.filename)
+    if Path(filename).suffix.lower() != ext:
+        filename = f"upload{ext}"
 
+    # Save uploaded file. Each upload gets its own directory: loaded files stay
+    # memory-mapped, so a later upload with the same name must not overwrite one.
+    file_dir = tempfile.mkdtemp(dir=upload_dir)
+    filepath = os.path.join(file_dir, filename)
     try:
-        # Load and process
-        info = processor.load_step(filepath)
+        file.save(filepath)
+    except Exception as e:
+        shutil.rmtree(file_dir, ignore_errors=True)
+        return jsonify({"error": str(e)}), 500
 
-        # Tessellate for 3D viewer
-        mesh_data = processor.tessellate()
+    try:
+        # Load and process (cached by file content); the mesh follows via /api/mesh_stream
+        info = load_into_processor(filepath, file_dir)
 
         # Get face metadata
         faces = processor.get_faces_metadata()
 
-        return jsonify({
+        return json_response({
             "success": True,
             "info": info,
-            "mesh": mesh_data,
             "faces": faces,
             "filename": file.filename,
         })
@@ -78,15 +156,22 @@ def load_file():
     if not filepath or not os.path.exists(filepath):
         return jsonify({"error": "File not found"}), 404
 
+    # Work from a private copy so the mapping survives the CAD tool re-saving the file
+    file_dir = tempfile.mkdtemp(dir=upload_dir)
+    local_copy = os.path.join(file_dir, Path(filepath).name)
+    try:
+        shutil.copyfile(filepath, local_copy)
+    except Exception as e:
+        shutil.rmtree(file_dir, ignore_errors=True)
+        return jsonify({"error": str(e)}), 500
+
     try:
-        info = processor.load_step(filepath)
-        mesh_data = processor.tessellate()
+        info = load_into_processor(local_copy, file_dir)
         faces = processor.get_faces_metadata()
 
-        return jsonify({
+        return json_response({
             "success": True,
             "info": info,
-            "mesh": mesh_data,
             "faces": faces,
             "filename": Path(filepath).name,
         })
@@ -94,34 +179,60 @@ def load_file():
         return jsonify({"error": str(e)}), 500
 
 
+@app.route('/api/mesh_stream')
+def mesh_stream():
+    """Stream the loaded file's mesh as server-sent events, one batch of faces at a time."""
+    if processor.shape is None:
+        return jsonify({"error": "No STEP file loaded"}), 400
+
+    active = processor  # Keep streaming this file even if another is loaded meanwhile
+
+    def generate():
+        try:
+            for batch in active.iter_mesh_batches():
+                yield sse_event("mesh", batch)
+            yield sse_event("done", {})
+        except Exception as e:
+            yield sse_event("mesh_error", {"error": str(e)})
+
+    return Response(
+        generate(),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache'},
+    )
+
+
 @app.route('/api/faces')
 def get_faces():
     """Get metadata for all faces."""
-    faces = processor.get_faces_metadata()
-    if not faces:
+    if not processor.get_faces_metadata():
         return jsonify({"error": "No STEP file loaded"}), 400
-    return jsonify({"faces": faces})
+    return Response(processor.get_faces_json(), mimetype='application/json')
 
 
 @app.route('/api/face/<int:face_id>')
 def get_face(face_id):
     """Get metadata for a specific face."""
-    meta = processor.get_face_metadata(face_id)
-    if meta is None:
+    blob = processor.get_face_json(face_id)
+    if blob is None:
         return jsonify({"error": "Face not found"}), 404
-    return jsonify(meta)
+    return Response(blob, mimetype='application/json')
 
 
 @app.route('/api/features', methods=['GET', 'POST'])
 def features():
     """Get or save feature definitions."""
-    global current_features
+    global features_state
 
     if request.method == 'GET':
-        return jsonify({"features": current_features})
+        return Response(features_state["json"], mimetype='application/json')
 
     data = request.get_json()
-    current_features = data.get("features", {})
+    new_features = data.get("features", {})
+    features_state = {
+        "features": new_features,
+        "json": orjson.dumps({"features": new_features}),
+    }
     return jsonify({"success": True})
 
 
@@ -129,7 +240,7 @@ def features():
 def export_step():
     """Export the STEP file with named faces."""
     data = request.get_json()
-    features = data.get("features", current_features)
+    features = data.get("features", features_state["features"])
 
     if not features:
         return jsonify({"error": "No features defined"}), 400
@@ -181,4 +292,6 @@ if __name__ == '__main__':
     if initial_file:
         os.environ['STEP_LABELER_INITIAL_FILE'] = initial_file
 
-    app.run(host='localhost', port=port, debug=False)
+    # Waitress serves requests from a thread pool, so face metadata and feature
+    # calls stay responsive while an upload or mesh stream is in progress
+    serve(app, host='localhost', port=port, threads=8, asyncore_use_poll=True)
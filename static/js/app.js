@@ -14,6 +14,7 @@
     let multiSelectMode = false;
     let lengthUnit = 'units';
     let lengthScale = 1.0;  // Scale factor from OCC meters to display unit
+    let meshStream = null;  // EventSource delivering mesh batches for the loaded file
 
     // --- DOM refs ---
     const canvas = document.getElementById('viewer-canvas');
@@ -210,8 +211,9 @@
         btnColors.classList.add('active');
         btnXray.classList.remove('active');
 
-        // Load mesh into viewer with face metadata for coloring
-        viewer.loadMesh(data.mesh, data.faces);
+        // Start an empty mesh with face metadata for coloring; batches stream in
+        viewer.beginMesh(data.info?.num_faces ?? data.faces.length, data.faces);
+        streamMesh();
 
         // Clear features then import any existing names from STEP
         featureManager.clear();
@@ -234,7 +236,43 @@
         updateFaceList();
     }
 
+    /**
+     * Receive the tessellated mesh as server-sent events, adding each batch
+     * of faces to the viewer as it arrives.
+     */
+    function streamMesh() {
+        closeMeshStream();
+        const stream = new EventSource('/api/mesh_stream');
+        meshStream = stream;
+
+        stream.addEventListener('mesh', (event) => {
+            viewer.appendMeshBatch(JSON.parse(event.data));
+        });
+        stream.addEventListener('done', () => {
+            closeMeshStream();
+        });
+        stream.addEventListener('mesh_error', (event) => {
+            closeMeshStream();
+            alert(`Error: ${JSON.parse(event.data).error}`);
+        });
+        stream.onerror = () => {
+            // Dropped before 'done' — close so EventSource doesn't reconnect and re-stream
+            if (meshStream === stream) {
+                closeMeshStream();
+                alert('Mesh loading was interrupted.');
+            }
+        };
+    }
+
+    function closeMeshStream() {
+        if (meshStream) {
+            meshStream.close();
+            meshStream = null;
+        }
+    }
+
     function clearFile() {
+        closeMeshStream();
         isLoaded = false;
         facesMetadata = [];
         lengthUnit = 'units';
@@ -11,6 +11,12 @@ class StepViewer {
         this.renderer = null;
         this.mesh = null;
         this.faceIds = [];        // Per-triangle face ID
+        this.faceIdBuffer = null; // Preallocated face ID storage; faceIds views its filled part
+        this.meshVertexCount = 0; // Filled vertices/triangles in the preallocated buffers
+        this.meshTriangleCount = 0;
+        this.meshBatchCount = 0;
+        this._meshBounds = new THREE.Box3();
+        this._tmpVector = new THREE.Vector3();
         this.faceColors = null;   // Per-vertex color buffer
         this.numFaces = 0;
         this.selectedFaces = new Set();
@@ -139,75 +145,265 @@ class StepViewer {
 
     loadMesh(data, facesMetadata) {
         /**
-         * Load tessellated mesh data from backend.
-         * data: { vertices: [...], normals: [...], triangles: [...], face_ids: [...], num_faces: N }
+         * Load a complete tessellated mesh from backend in one go.
+         * data: a single mesh batch carrying edges_b64 (see appendMeshBatch)
          * facesMetadata: array of { id, surface_type, area, ... } for each face
          */
+        this.beginMesh(data.num_faces, facesMetadata);
+        this.appendMeshBatch(data);
+    }
+
+    beginMesh(numFaces, facesMetadata) {
+        /**
+         * Remove the current mesh and reset state before mesh batches arrive.
+         * facesMetadata: array of { id, surface_type, area, ... } for each face
+         */
+        this.clearMesh();
+        this.numFaces = numFaces;
         this.facesMetadata = facesMetadata || [];
+        this.xrayMode = false;
+    }
 
-        // Remove old mesh
-        if (this.mesh) {
-            this.scene.remove(this.mesh);
-            this.mesh.geometry.dispose();
-            this.mesh.material.dispose();
+    appendMeshBatch(data) {
+        /**
+         * Add a batch of tessellated faces from backend and redraw.
+         * data: { vertices_q_b64, offset, scale, normals_oct_b64, triangles_b64, face_ids_b64,
+         *         num_faces, edges_b64? }
+         *   Buffers are base64-encoded little-endian bytes: Uint16 quantized positions
+         *   (position = q * scale + offset per axis), Int8 oct-encoded normal pairs,
+         *   Uint32 indices, Float32 edges.
+         *   Triangle indices are relative to the batch's own vertices.
+         *   Only the final batch carries edges_b64.
+         * The batch is written into the tail of preallocated buffers; only that
+         * range is recolored and re-uploaded.
+         */
+        const indices = this._decodeBuffer(data.triangles_b64, Uint32Array);
+        if (indices.length > 0) {
+            const vertices = this._dequantize(
+                this._decodeBuffer(data.vertices_q_b64, Uint16Array), data.offset, data.scale
+            );
+            const normals = this._octDecode(this._decodeBuffer(data.normals_oct_b64, Int8Array));
+            const faceIds = this._decodeBuffer(data.face_ids_b64, Uint32Array);
+            const vertexStart = this.meshVertexCount;
+            const triStart = this.meshTriangleCount;
+            const vertexEnd = vertexStart + vertices.length / 3;
+            const triEnd = triStart + faceIds.length;
+
+            // Shift indices past the vertices of earlier batches
+            for (let i = 0; i < indices.length; i++) {
+                indices[i] += vertexStart;
+            }
+
+            const isFirstBatch = !this.mesh;
+            this._reserveGeometry(vertexEnd, triEnd);
+            const geometry = this.mesh.geometry;
+            const position = geometry.getAttribute('position');
+            const normal = geometry.getAttribute('normal');
+            position.array.set(vertices, vertexStart * 3);
+            normal.array.set(normals, vertexStart * 3);
+            geometry.index.array.set(indices, triStart * 3);
+            this.faceIdBuffer.set(faceIds, triStart);
+            this._resetColors(this.faceColors.array, vertexStart, vertexEnd);
+
+            this._markDirty(position, vertexStart * 3, vertices.length);
+            this._markDirty(normal, vertexStart * 3, normals.length);
+            this._markDirty(geometry.index, triStart * 3, indices.length);
+            this._markDirty(this.faceColors, vertexStart * 3, vertices.length);
+
+            this.meshVertexCount = vertexEnd;
+            this.meshTriangleCount = triEnd;
+            this.meshBatchCount++;
+            this.faceIds = this.faceIdBuffer.subarray(0, triEnd);
+            geometry.setDrawRange(0, triEnd * 3);
+
+            // Bounds cover only the filled range, not the spare capacity
+            for (let i = 0; i < vertices.length; i += 3) {
+                this._meshBounds.expandByPoint(
+                    this._tmpVector.set(vertices[i], vertices[i + 1], vertices[i + 2])
+                );
+            }
+            geometry.boundingBox = this._meshBounds.clone();
+            geometry.boundingSphere = this._meshBounds.getBoundingSphere(new THREE.Sphere());
+
+            this._applyFaceStates(triStart, vertexStart);
+            if (isFirstBatch) this._fitCamera();
         }
 
-        this.faceIds = data.face_ids;
-        this.numFaces = data.num_faces;
+        if (data.edges_b64 !== undefined) {
+            this._setEdges(this._decodeBuffer(data.edges_b64, Float32Array));
+            // Refit once the whole model is in, if it arrived in several batches
+            if (this.meshBatchCount > 1) this._fitCamera();
+        }
+    }
 
-        // Build geometry
-        const geometry = new THREE.BufferGeometry();
+    _reserveGeometry(numVertices, numTriangles) {
+        /**
+         * Make sure the mesh buffers can hold numVertices and numTriangles, growing
+         * capacity by doubling so the total copying stays linear in mesh size.
+         * Only a resize replaces the geometry (and re-uploads it in full).
+         */
+        const geometry = this.mesh ? this.mesh.geometry : null;
+        const vertexCapacity = geometry ? geometry.getAttribute('position').count : 0;
+        const triCapacity = geometry ? geometry.index.count / 3 : 0;
+        if (geometry && numVertices <= vertexCapacity && numTriangles <= triCapacity) return;
+
+        const newVertexCapacity = Math.max(numVertices, vertexCapacity * 2);
+        const newTriCapacity = Math.max(numTriangles, triCapacity * 2);
+        const grow = (ArrayType, old, length) => {
+            const grown = new ArrayType(length);
+            if (old) grown.set(old.subarray(0, Math.min(old.length, length)));
+            return grown;
+        };
 
-        const vertices = new Float32Array(data.vertices);
-        const normals = new Float32Array(data.normals);
-        const indices = new Uint32Array(data.triangles);
+        const oldArray = (name) => geometry && geometry.getAttribute(name).array;
+        const newGeometry = new THREE.BufferGeometry();
+        for (const name of ['position', 'normal', 'color']) {
+            // color holds the per-vertex colors for face highlighting
+            const array = grow(Float32Array, oldArray(name), newVertexCapacity * 3);
+            newGeometry.setAttribute(name, new THREE.BufferAttribute(array, 3));
+        }
+        const indexArray = grow(Uint32Array, geometry && geometry.index.array, newTriCapacity * 3);
+        newGeometry.setIndex(new THREE.BufferAttribute(indexArray, 1));
+        newGeometry.setDrawRange(0, this.meshTriangleCount * 3);
+        this.faceColors = newGeometry.getAttribute('color');
+        this.faceIdBuffer = grow(Uint32Array, this.faceIdBuffer, newTriCapacity);
+        this.faceIds = this.faceIdBuffer.subarray(0, this.meshTriangleCount);
 
-        geometry.setAttribute('position', new THREE.BufferAttribute(vertices, 3));
-        geometry.setAttribute('normal', new THREE.BufferAttribute(normals, 3));
-        geometry.setIndex(new THREE.BufferAttribute(indices, 1));
+        if (this.mesh) {
+            this.mesh.geometry.dispose();
+            this.mesh.geometry = newGeometry;
+        } else {
+            // Material with vertex colors
+            const material = new THREE.MeshPhongMaterial({
+                vertexColors: true,
+                side: THREE.DoubleSide,
+                shininess: 30,
+                transparent: false,
+            });
 
-        // Per-vertex colors for face highlighting
-        const colors = new Float32Array(vertices.length);
-        this._resetColors(colors, indices, data.face_ids);
-        geometry.setAttribute('color', new THREE.BufferAttribute(colors, 3));
-        this.faceColors = geometry.getAttribute('color');
+            this.mesh = new THREE.Mesh(newGeometry, material);
+            this.scene.add(this.mesh);
 
-        // Material with vertex colors
-        const material = new THREE.MeshPhongMaterial({
-            vertexColors: true,
-            side: THREE.DoubleSide,
-            shininess: 30,
-            transparent: false,
-        });
+            // Pick up view modes toggled before the first batch arrived
+            this.setXray(this.xrayMode);
+            this._applyClippingPlane();
+        }
+    }
 
-        this.mesh = new THREE.Mesh(geometry, material);
-        this.scene.add(this.mesh);
-
-        // Edge outline from CAD topology (if provided)
-        if (data.edges && data.edges.length > 0) {
-            const edgeGeo = new THREE.BufferGeometry();
-            const edgeVerts = new Float32Array(data.edges);
-            edgeGeo.setAttribute('position', new THREE.BufferAttribute(edgeVerts, 3));
-            const edgeMat = new THREE.LineBasicMaterial({
-                color: 0x000000,
-                linewidth: 1,
-            });
-            this.wireframe = new THREE.LineSegments(edgeGeo, edgeMat);
-            this.wireframe.visible = this.wireframeVisible;
-            this.mesh.add(this.wireframe);
+    _markDirty(attr, start, count) {
+        /**
+         * Flag [start, start + count) of a buffer attribute for upload, merging with
+         * any range still waiting (three.js resets updateRange.count to -1 once uploaded).
+         */
+        const range = attr.updateRange;
+        if (range.count === -1) {
+            range.offset = start;
+            range.count = count;
         } else {
+            const end = Math.max(range.offset + range.count, start + count);
+            range.offset = Math.min(range.offset, start);
+            range.count = end - range.offset;
+        }
+        attr.needsUpdate = true;
+    }
+
+    _applyFaceStates(firstTriangle = 0, firstVertex = 0) {
+        /**
+         * Apply feature, hidden, and selection colors to triangles from
+         * firstTriangle on, in a single pass. Those triangles must only use
+         * vertices from firstVertex on (true for a batch and its own vertices).
+         */
+        const overrides = new Map();
+        if (this.colorsVisible) {
+            for (const [faceId, color] of Object.entries(this.featureColors)) {
+                overrides.set(Number(faceId), color);
+            }
+        }
+        for (const faceId of this.hiddenFaces) {
+            overrides.set(faceId, [0.12, 0.12, 0.14]); // Near-background
+        }
+        for (const faceId of this.selectedFaces) {
+            overrides.set(faceId, [0.3, 0.6, 1.0]); // Selection blue
+        }
+        if (overrides.size === 0) return;
+
+        const indices = this.mesh.geometry.index.array;
+        const colorAttr = this.faceColors;
+        let touched = false;
+        for (let i = firstTriangle; i < this.faceIds.length; i++) {
+            const color = overrides.get(this.faceIds[i]);
+            if (color === undefined) continue;
+            for (let v = 0; v < 3; v++) {
+                colorAttr.setXYZ(indices[i * 3 + v], color[0], color[1], color[2]);
+            }
+            touched = true;
+        }
+        if (touched) {
+            this._markDirty(colorAttr, firstVertex * 3, (this.meshVertexCount - firstVertex) * 3);
+        }
+    }
+
+    _setEdges(edgeVerts) {
+        /**
+         * Attach the CAD topological edge outline to the mesh.
+         */
+        if (!this.mesh || edgeVerts.length === 0) {
             this.wireframe = null;
+            return;
         }
 
-        // Fit camera
-        this._fitCamera();
+        const edgeGeo = new THREE.BufferGeometry();
+        edgeGeo.setAttribute('position', new THREE.BufferAttribute(edgeVerts, 3));
+        const edgeMat = new THREE.LineBasicMaterial({
+            color: 0x000000,
+            linewidth: 1,
+        });
+        this.wireframe = new THREE.LineSegments(edgeGeo, edgeMat);
+        this.wireframe.visible = this.wireframeVisible;
+        this.mesh.add(this.wireframe);
+        this._applyClippingPlane();
+    }
 
-        // Clear state
-        this.selectedFaces.clear();
-        this.hiddenFaces.clear();
-        this.featureColors = {};
-        this.xrayMode = false;
-        this.clearClipping();
+    _decodeBuffer(b64, ArrayType) {
+        /**
+         * Decode a base64 string of little-endian bytes into a typed array.
+         */
+        const bytes = Uint8Array.from(atob(b64), c => c.charCodeAt(0));
+        return new ArrayType(bytes.buffer);
+    }
+
+    _dequantize(quantized, offset, scale) {
+        /**
+         * Rebuild float positions from per-axis Uint16 quantized values.
+         */
+        const out = new Float32Array(quantized.length);
+        for (let i = 0; i < quantized.length; i += 3) {
+            out[i] = quantized[i] * scale[0] + offset[0];
+            out[i + 1] = quantized[i + 1] * scale[1] + offset[1];
+            out[i + 2] = quantized[i + 2] * scale[2] + offset[2];
+        }
+        return out;
+    }
+
+    _octDecode(encoded) {
+        /**
+         * Expand Int8 octahedral-encoded normal pairs into unit xyz normals.
+         */
+        const out = new Float32Array((encoded.length / 2) * 3);
+        for (let i = 0, j = 0; i < encoded.length; i += 2, j += 3) {
+            let x = encoded[i] / 127;
+            let y = encoded[i + 1] / 127;
+            const z = 1 - Math.abs(x) - Math.abs(y);
+            // Unfold the lower hemisphere
+            const t = Math.max(-z, 0);
+            x += x >= 0 ? -t : t;
+            y += y >= 0 ? -t : t;
+            const len = Math.hypot(x, y, z) || 1;
+            out[j] = x / len;
+            out[j + 1] = y / len;
+            out[j + 2] = z / len;
+        }
+        return out;
     }
 
     clearMesh() {
@@ -226,6 +422,11 @@ class StepViewer {
 
         this.faceIds = [];
         this.faceColors = null;
+        this.faceIdBuffer = null;
+        this.meshVertexCount = 0;
+        this.meshTriangleCount = 0;
+        this.meshBatchCount = 0;
+        this._meshBounds.makeEmpty();
         this.numFaces = 0;
         this.facesMetadata = [];
         this.selectedFaces.clear();
@@ -235,14 +436,13 @@ class StepViewer {
         this.clearClipping();
     }
 
-    _resetColors(colorArray, indices, faceIds) {
+    _resetColors(colorArray, vertexStart, vertexEnd) {
         /**
-         * Assign base color to each face.
+         * Assign base color to vertices [vertexStart, vertexEnd).
          */
         const baseColor = [0.6, 0.6, 0.65];
 
-        // First, initialize ALL vertices to base color
-        for (let i = 0; i < colorArray.length; i += 3) {
+        for (let i = vertexStart * 3; i < vertexEnd * 3; i += 3) {
             colorArray[i] = baseColor[0];
             colorArray[i + 1] = baseColor[1];
             colorArray[i + 2] = baseColor[2];
@@ -323,7 +523,7 @@ class StepViewer {
                 }
             }
         }
-        colorAttr.needsUpdate = true;
+        this._markDirty(colorAttr, 0, this.meshVertexCount * 3);
     }
 
     resetFaceColor(faceId) {
@@ -3,10 +3,15 @@ STEP file processor using OCC (via CadQuery/OCP).
 Handles reading, tessellating, face metadata extraction, and named STEP export.
 """
 
+import base64
 import math
+import mmap
+import os
 import re
-import json
+import threading
 import numpy as np
+import orjson
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 import cadquery as cq
@@ -16,6 +21,8 @@ from OCP.GCPnts import GCPnts_TangentialDeflection
 from OCP.BRepAdaptor import BRepAdaptor_Curve
 from OCP.BRep import BRep_Tool
 from OCP.BRepMesh import BRepMesh_IncrementalMesh
+from OCP.BRepTools import BRepTools
+from OCP.IMeshTools import IMeshTools_Parameters
 from OCP.TopLoc import TopLoc_Location
 from OCP.BRepGProp import BRepGProp
 from OCP.GProp import GProp_GProps
@@ -44,6 +51,290 @@ SURFACE_TYPE_NAMES = {
     GeomAbs_OffsetSurface: "offset",
 }
 
+# Per-face numeric metadata gathered before rounding:
+# area, centroid xyz, normal xyz, bounds (xmin, ymin, zmin, xmax, ymax, zmax)
+FACE_VALUE_COLUMNS = 13
+
+# Target triangle count per batch when streaming the mesh progressively
+MESH_BATCH_TRIANGLES = 50000
+
+# Squared cross-product length below which a triangle is ignored for vertex normals
+DEGENERATE_TRIANGLE_AREA2 = 1e-20
+
+# ADVANCED_FACE scanning: locate the keyword literally, then check the "#N =" head
+# before it and read the first quoted string (the name) after it
+_ADVANCED_FACE = b"ADVANCED_FACE"
+_STEP_WHITESPACE = b" \t\r\n\f\v"
+
+# First quoted string in an entity, i.e. its name argument (renamed on export)
+_FIRST_QUOTED_RE = re.compile(rb"'[^']*'")
+
+# Length unit patterns, matched case-insensitively against the raw STEP bytes
+_CONVERSION_UNIT_RE = re.compile(rb"CONVERSION_BASED_UNIT\s*\(\s*'(\w+)'", re.IGNORECASE)
+_SI_PREFIXED_METRE_RE = re.compile(
+    rb"SI_UNIT\s*\(\s*\.(\w+)\.\s*,\s*\.METRE\.\s*\)", re.IGNORECASE
+)
+_SI_METRE_RE = re.compile(rb"SI_UNIT\s*\(\s*\$\s*,\s*\.METRE\.\s*\)", re.IGNORECASE)
+
+
+def _skip_whitespace(data, pos):
+    """Index of the first non-whitespace byte at or after pos."""
+    end = len(data)
+    while pos < end and data[pos] in _STEP_WHITESPACE:
+        pos += 1
+    return pos
+
+
+def _parse_entity_head(data, start, stop):
+    """Entity number from a "#N =" head spanning data[start:stop], or None if malformed."""
+    number, eq, rest = data[start + 1:stop].partition(b"=")
+    number = number.rstrip(_STEP_WHITESPACE)
+    if not eq or not number.isdigit() or rest.strip(_STEP_WHITESPACE):
+        return None
+    return int(number)
+
+
+def _parse_entity_name(data, pos):
+    """(name bytes, end offset) of a "( 'name'" argument opening at pos, or None."""
+    pos = _skip_whitespace(data, pos)
+    if data[pos:pos + 1] != b"(":
+        return None
+    pos = _skip_whitespace(data, pos + 1)
+    if data[pos:pos + 1] != b"'":
+        return None
+    close = data.find(b"'", pos + 1)
+    if close < 0:
+        return None
+    return data[pos + 1:close], close + 1
+
+
+def _spread_bits(values):
+    """Spread the low 16 bits of each uint64 so two zero bits separate each original bit."""
+    values = (values | (values << np.uint64(16))) & np.uint64(0x0000FF0000FF)
+    values = (values | (values << np.uint64(8))) & np.uint64(0x00F00F00F00F)
+    values = (values | (values << np.uint64(4))) & np.uint64(0x0C30C30C30C3)
+    values = (values | (values << np.uint64(2))) & np.uint64(0x249249249249)
+    return values
+
+
+def _morton_codes(points):
+    """48-bit Morton (Z-order) codes of (N, 3) points, quantized to 16 bits per axis."""
+    if len(points) == 0:
+        return np.empty(0, dtype=np.uint64)
+    quantized, _, _ = _quantize_positions(points, _vertex_bounds(points))
+    quantized = quantized.astype(np.uint64)
+    return (
+        _spread_bits(quantized[:, 0])
+        | (_spread_bits(quantized[:, 1]) << np.uint64(1))
+        | (_spread_bits(quantized[:, 2]) << np.uint64(2))
+    )
+
+
+def _trsf_to_affine(trsf):
+    """Split a gp_Trsf into a 3x3 linear part and a translation vector."""
+    matrix = np.array([[trsf.Value(row, col) for col in range(1, 5)] for row in range(1, 4)])
+    return matrix[:, :3], matrix[:, 3]
+
+
+def _encode_array(arr, dtype):
+    """Base64-encode an array as little-endian typed-array bytes for the browser."""
+    return base64.b64encode(np.ascontiguousarray(arr, dtype=dtype).tobytes()).decode("ascii")
+
+
+def _triangulation_to_numpy(triangulation):
+    """Copy a Poly_Triangulation into NumPy arrays, in the triangulation's local frame.
+
+    Returns (nodes, triangles, normals): (N, 3) float64 node coordinates, (T, 3)
+    0-based node indices, and (N, 3) float64 normals or None if none are stored.
+    """
+    num_nodes = triangulation.NbNodes()
+    num_tris = triangulation.NbTriangles()
+    nodes = np.array(
+        [(p.X(), p.Y(), p.Z()) for p in map(triangulation.Node, range(1, num_nodes + 1))],
+        dtype=np.float64,
+    ).reshape(num_nodes, 3)
+    tris = np.array(
+        [tri.Get() for tri in map(triangulation.Triangle, range(1, num_tris + 1))],
+        dtype=np.int64,
+    ).reshape(num_tris, 3) - 1
+    normals = None
+    if triangulation.HasNormals():
+        normals = np.array(
+            [(d.X(), d.Y(), d.Z()) for d in map(triangulation.Normal, range(1, num_nodes + 1))],
+            dtype=np.float64,
+        ).reshape(num_nodes, 3)
+    return nodes, tris, normals
+
+
+def _vertex_normals(verts, tris):
+    """Average adjacent triangle normals onto vertices, falling back to +Z where undefined."""
+    v0 = verts[tris[:, 0]]
+    tri_normals = np.cross(verts[tris[:, 1]] - v0, verts[tris[:, 2]] - v0)
+
+    # Drop zero-area and sliver triangles; their normals are noise
+    area2 = np.einsum("ij,ij->i", tri_normals, tri_normals)
+    keep = area2 > DEGENERATE_TRIANGLE_AREA2
+    tris = tris[keep]
+    tri_normals = tri_normals[keep]
+
+    # Scatter-add each triangle normal onto its three corners; bincount sums the
+    # repeated vertex indices in one buffered pass per axis
+    corners = tris.ravel()
+    corner_normals = np.repeat(tri_normals, 3, axis=0)
+    vertex_normals = np.stack(
+        [np.bincount(corners, weights=corner_normals[:, axis], minlength=len(verts))
+         for axis in range(3)],
+        axis=1,
+    )
+
+    lengths = np.linalg.norm(vertex_normals, axis=1, keepdims=True)
+    return np.divide(
+        vertex_normals, lengths,
+        out=np.tile(np.array([0.0, 0.0, 1.0], dtype=verts.dtype), (len(verts), 1)),
+        where=lengths > 0,
+    )
+
+
+def _face_mesh(face, triangulation_cache=None):
+    """Triangulation of one meshed face in world coordinates, or None if it has none.
+
+    Returns (verts, normals, tris): normals is None when the triangulation stores
+    none, and tris are 0-based with winding swapped for reversed faces.
+
+    triangulation_cache, if given, is a dict shared across faces so a Poly_Triangulation
+    reused by several faces (e.g. instanced parts) is copied out of OCC only once.
+    """
+    location = TopLoc_Location()
+    triangulation = BRep_Tool.Triangulation_s(face, location)
+    if triangulation is None:
+        return None
+
+    is_reversed = face.Orientation() == 1  # TopAbs_REVERSED
+    if triangulation_cache is None:
+        nodes, tris, normals = _triangulation_to_numpy(triangulation)
+    else:
+        # Keyed by wrapper identity; the entry keeps the wrapper alive so the id is not
+        # reused, and pybind11 hands back that same wrapper for the same triangulation
+        cached = triangulation_cache.get(id(triangulation))
+        if cached is None:
+            cached = (triangulation, *_triangulation_to_numpy(triangulation))
+            triangulation_cache[id(triangulation)] = cached
+        _, nodes, tris, normals = cached
+
+    # Apply the face location to all vertices as a single matmul; most single-part
+    # files have identity locations, which need no transform at all
+    verts = nodes
+    if not location.IsIdentity():
+        rotation, translation = _trsf_to_affine(location.Transformation())
+        verts = nodes @ rotation.T + translation
+        # Stored normals only see the linear part of the transform
+        if normals is not None:
+            normals = normals @ rotation.T
+
+    if is_reversed:
+        tris = tris[:, [0, 2, 1]]
+        if normals is not None:
+            normals = -normals
+
+    return verts, normals, tris
+
+
+def _combine_face_meshes(face_meshes):
+    """Concatenate (face_id, verts, normals, tris) entries into one indexed mesh.
+
+    Returns (vertices, normals, triangles, face_ids) with one face id per triangle:
+    float32 coordinates and uint32 indices, the layout the viewer's buffers use.
+    """
+    face_meshes = list(face_meshes)
+
+    # Size the combined buffers up front and fill them by slice per face
+    vert_counts = np.array([len(verts) for _, verts, _, _ in face_meshes], dtype=np.int64)
+    tri_counts = np.array([len(tris) for _, _, _, tris in face_meshes], dtype=np.int64)
+    vert_offsets = np.concatenate(([0], np.cumsum(vert_counts)))
+    tri_offsets = np.concatenate(([0], np.cumsum(tri_counts)))
+
+    vertices = np.empty((vert_offsets[-1], 3), dtype=np.float32)
+    normals = np.empty((vert_offsets[-1], 3), dtype=np.float32)
+    triangles = np.empty((tri_offsets[-1], 3), dtype=np.uint32)
+    face_ids = np.repeat(
+        np.array([face_id for face_id, _, _, _ in face_meshes], dtype=np.uint32), tri_counts
+    )
+    # Faces whose triangulation has no stored normals
+    missing_normals = np.array(
+        [face_normals is None for _, _, face_normals, _ in face_meshes], dtype=bool
+    )
+
+    for i, (_, verts, face_normals, tris) in enumerate(face_meshes):
+        v_start, v_stop = vert_offsets[i], vert_offsets[i + 1]
+        vertices[v_start:v_stop] = verts
+        np.add(
+            tris, v_start,
+            out=triangles[tri_offsets[i]:tri_offsets[i + 1]], casting="unsafe",
+        )
+        if face_normals is not None:
+            normals[v_start:v_stop] = face_normals
+
+    # Compute missing normals for all such faces in one pass. Triangles are already
+    # wound for face orientation, so reversed faces come out flipped.
+    if missing_normals.any():
+        vert_missing = np.repeat(missing_normals, vert_counts)
+        computed = _vertex_normals(vertices, triangles[np.repeat(missing_normals, tri_counts)])
+        normals[vert_missing] = computed[vert_missing]
+
+    return vertices, normals, triangles, face_ids
+
+
+def _quantize_positions(vertices, bounds):
+    """Quantize positions to uint16 per axis over bounds, a (2, 3) [min, max] array.
+
+    Returns (quantized, offset, scale) with vertices ~= quantized * scale + offset.
+    """
+    offset = bounds[0]
+    extent = bounds[1] - bounds[0]
+    scale = np.where(extent > 0, extent / 65535.0, 1.0)
+    quantized = np.clip(np.rint((vertices - offset) / scale), 0, 65535)
+    return quantized, offset, scale
+
+
+def _oct_encode(normals):
+    """Octahedral-encode unit normals into two int8 components each."""
+    l1 = np.sum(np.abs(normals), axis=1, keepdims=True)
+    n = np.divide(normals, l1, out=np.zeros_like(normals), where=l1 > 0)
+    x, y, z = n[:, 0], n[:, 1], n[:, 2]
+    sign_x = np.where(x >= 0, 1.0, -1.0)
+    sign_y = np.where(y >= 0, 1.0, -1.0)
+    # Fold the lower hemisphere over the diagonals of the upper one
+    lower = z < 0
+    u = np.where(lower, (1 - np.abs(y)) * sign_x, x)
+    v = np.where(lower, (1 - np.abs(x)) * sign_y, y)
+    return np.rint(np.clip(np.stack([u, v], axis=1), -1, 1) * 127)
+
+
+def _encode_mesh(vertices, normals, triangles, face_ids, bounds=None):
+    """Encode combined mesh arrays as the base64 buffers the viewer decodes.
+
+    Positions are quantized to uint16 over bounds (default: the vertices' own box);
+    pass shared bounds when several batches must land on the same grid.
+    """
+    if bounds is None:
+        bounds = _vertex_bounds(vertices)
+    quantized, offset, scale = _quantize_positions(vertices, bounds)
+    return {
+        "vertices_q_b64": _encode_array(quantized, "<u2"),
+        "offset": offset.tolist(),
+        "scale": scale.tolist(),
+        "normals_oct_b64": _encode_array(_oct_encode(normals), "i1"),
+        "triangles_b64": _encode_array(triangles, "<u4"),
+        "face_ids_b64": _encode_array(face_ids, "<u4"),
+    }
+
+
+def _vertex_bounds(vertices):
+    """(2, 3) [min, max] box of an (N, 3) array; a unit box at the origin if empty."""
+    if len(vertices) == 0:
+        return np.array([[0.0, 0.0, 0.0], [1.0, 1.0, 1.0]])
+    return np.stack([vertices.min(axis=0), vertices.max(axis=0)])
+
 
 class StepProcessor:
     """Processes STEP files: read, tessellate, extract metadata, export with names."""
@@ -51,20 +342,41 @@ class StepProcessor:
     def __init__(self):
         self.shape = None
         self.faces = []  # List of TopoDS_Face
-        self.face_metadata = []  # List of dicts with face info
+        self.face_metadata = []  # Dicts with face info by face id, None until extracted
+        self._mesh_face_order = None  # Face ids in spatial (Morton) order, built on first mesh
+        self._mesh_batches = None  # (params, batches) from the last complete iter_mesh_batches()
+        self._mesh_params = None  # (linear, angular) deflections the shape is meshed at
+        # Serializes meshing and batch building; cached processors can serve several
+        # mesh streams at once, and OCC meshing of one shape must not run concurrently
+        self._mesh_lock = threading.Lock()
+        self._faces_json_cache = None  # Serialized {"faces": face_metadata}
+        self._face_json_cache = []  # Serialized face_metadata entries by face id, or None
         self.step_path = None
         self.step_content = None
-        self.advanced_face_lines = []  # (line_number, original_name) tuples
+        # ADVANCED_FACE entities in file order, as parallel columns
+        self.face_entity_ids = np.empty(0, dtype=np.int64)  # STEP entity numbers (#N)
+        self.face_entity_names = []  # Original name strings
+        self.face_entity_starts = np.empty(0, dtype=np.int64)  # Byte offset of "#N"
+        self.face_entity_ends = np.empty(0, dtype=np.int64)  # Byte offset past the quoted name
+        self.face_entity_index_by_id = {}  # STEP entity number -> column index
         self.length_unit = "units"  # Default if not detected
         self.length_scale = 1.0  # Scale factor from OCC internal units (meters) to display unit
 
     def load_step(self, filepath):
         """Load a STEP file and extract topology."""
         self.step_path = Path(filepath)
-
-        # Read raw STEP content for later text manipulation
-        with open(filepath, 'r') as f:
-            self.step_content = f.read()
+        self._mesh_batches = None
+        self._mesh_params = None
+
+        # Map raw STEP bytes for later text manipulation (STEP is ASCII, no decode needed).
+        # Pages are read on demand, so large files are never held in memory whole.
+        # The file must not be rewritten while mapped.
+        self.close()
+        with open(filepath, 'rb') as f:
+            if self.step_path.stat().st_size > 0:
+                self.step_content = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            else:
+                self.step_content = b""
 
         # Parse ADVANCED_FACE entity locations in the STEP text
         self._parse_step_entities()
@@ -84,36 +396,56 @@ class StepProcessor:
             self.faces.append(face)
             explorer.Next()
 
-        # Extract metadata for each face
-        self.face_metadata = []
-        for i, face in enumerate(self.faces):
-            meta = self._extract_face_metadata(face, i)
-            self.face_metadata.append(meta)
+        # Face metadata is extracted on first request, so callers that never read it
+        # (e.g. export-only use) skip the per-face OCCT queries entirely
+        self.face_metadata = [None] * len(self.faces)
+        self._mesh_face_order = None
+        self._faces_json_cache = None
+        self._face_json_cache = [None] * len(self.faces)
 
         return {
             "num_faces": len(self.faces),
-            "num_step_entities": len(self.advanced_face_lines),
+            "num_step_entities": len(self.face_entity_names),
             "length_unit": self.length_unit,
             "length_scale": self.length_scale,
         }
 
+    def close(self):
+        """Release the memory-mapped STEP content, if any."""
+        if isinstance(self.step_content, mmap.mmap):
+            self.step_content.close()
+        self.step_content = None
+
     def _parse_step_entities(self):
         """Find all ADVANCED_FACE entities in the STEP text and record their positions."""
-        self.advanced_face_lines = []
-        pattern = re.compile(
-            r"(#(\d+)\s*=\s*ADVANCED_FACE\s*\(\s*'([^']*)')",
-            re.IGNORECASE
-        )
-        for match in pattern.finditer(self.step_content):
-            entity_id = int(match.group(2))
-            name = match.group(3)
-            start_pos = match.start()
-            self.advanced_face_lines.append({
-                "entity_id": entity_id,
-                "name": name,
-                "start_pos": start_pos,
-                "match_text": match.group(1),
-            })
+        entity_ids = []
+        names = []
+        starts = []
+        ends = []
+        content = self.step_content
+
+        # Keyword search is a linear memmem scan; each hit is checked with find/slicing.
+        # ISO 10303-21 keywords are uppercase, so the literal match is case-sensitive.
+        pos = content.find(_ADVANCED_FACE)
+        while pos >= 0:
+            after = pos + len(_ADVANCED_FACE)
+            head_start = content.rfind(b"#", 0, pos)
+            entity_id = None
+            if head_start >= 0:
+                entity_id = _parse_entity_head(content, head_start, pos)
+            name = _parse_entity_name(content, after) if entity_id is not None else None
+            if name:
+                entity_ids.append(entity_id)
+                names.append(name[0].decode("utf-8", errors="replace"))
+                starts.append(head_start)
+                ends.append(name[1])
+            pos = content.find(_ADVANCED_FACE, after)
+
+        self.face_entity_ids = np.asarray(entity_ids, dtype=np.int64)
+        self.face_entity_names = names
+        self.face_entity_starts = np.asarray(starts, dtype=np.int64)
+        self.face_entity_ends = np.asarray(ends, dtype=np.int64)
+        self.face_entity_index_by_id = {entity_id: i for i, entity_id in enumerate(entity_ids)}
 
     def _parse_length_unit(self):
         """Extract length unit from STEP file (SI_UNIT or CONVERSION_BASED_UNIT).
@@ -121,8 +453,6 @@ class StepProcessor:
         Also sets length_scale to convert from OCC internal units (mm) to display unit.
         OCC normalizes STEP geometry to millimeters regardless of the file's original units.
         """
-        content = self.step_content.upper()
-
         # Scale factors: OCC uses millimeters internally, so these convert mm -> display unit
         scale_map = {
             "mm": 1.0,
@@ -138,9 +468,9 @@ class StepProcessor:
 
         # Check for CONVERSION_BASED_UNIT FIRST - e.g., CONVERSION_BASED_UNIT('INCH',...)
         # This takes priority because it indicates the user's intended display unit
-        conv_match = re.search(r"CONVERSION_BASED_UNIT\s*\(\s*'(\w+)'", content)
+        conv_match = _CONVERSION_UNIT_RE.search(self.step_content)
         if conv_match:
-            unit_name = conv_match.group(1)
+            unit_name = conv_match.group(1).decode("ascii").upper()
             unit_map = {
                 "INCH": "in",
                 "FOOT": "ft",
@@ -152,9 +482,9 @@ class StepProcessor:
             return
 
         # Look for SI_UNIT with length prefix - e.g., SI_UNIT(.MILLI.,.METRE.)
-        si_match = re.search(r"SI_UNIT\s*\(\s*\.(\w+)\.\s*,\s*\.METRE\.\s*\)", content)
+        si_match = _SI_PREFIXED_METRE_RE.search(self.step_content)
         if si_match:
-            prefix = si_match.group(1)
+            prefix = si_match.group(1).decode("ascii").upper()
             prefix_map = {
                 "MILLI": "mm",
                 "CENTI": "cm",
@@ -166,7 +496,7 @@ class StepProcessor:
             return
 
         # Check for bare SI_UNIT($,.METRE.) - meters with no prefix
-        if re.search(r"SI_UNIT\s*\(\s*\$\s*,\s*\.METRE\.\s*\)", content):
+        if _SI_METRE_RE.search(self.step_content):
             self.length_unit = "m"
             self.length_scale = 0.001
             return
@@ -175,36 +505,77 @@ class StepProcessor:
         self.length_unit = "mm"
         self.length_scale = 1.0
 
-    def _extract_face_metadata(self, face, face_id):
-        """Extract geometric metadata from a TopoDS_Face."""
+    def _ensure_face_metadata(self, face_ids):
+        """Extract metadata for any of the given faces that do not have it yet."""
+        missing = [face_id for face_id in face_ids if self.face_metadata[face_id] is None]
+        if not missing:
+            return
+        if len(missing) == 1:
+            # Not worth spinning up a thread pool for a single face
+            self.face_metadata[missing[0]] = self._extract_chunk_metadata(missing)[0]
+            return
+
+        # The work is OCCT C++ calls on independent faces, so fan contiguous chunks
+        # out across threads; map() keeps chunk order.
+        num_workers = min(os.cpu_count() or 1, len(missing))
+        chunk_size = math.ceil(len(missing) / num_workers)
+        chunks = [missing[i:i + chunk_size] for i in range(0, len(missing), chunk_size)]
+        with ThreadPoolExecutor(max_workers=num_workers) as executor:
+            results = executor.map(self._extract_chunk_metadata, chunks)
+            for chunk, chunk_meta in zip(chunks, results):
+                for face_id, meta in zip(chunk, chunk_meta):
+                    self.face_metadata[face_id] = meta
+
+    def _extract_chunk_metadata(self, face_ids):
+        """Extract metadata for a range of faces, sharing one props and bbox between them."""
+        props = GProp_GProps()
+        bbox = Bnd_Box()
+        # Raw area, centroid, normal and bounds per face, rounded together afterwards
+        values = np.zeros((len(face_ids), FACE_VALUE_COLUMNS))
+        metadata = [
+            self._extract_face_metadata(self.faces[face_id], face_id, props, bbox, row)
+            for face_id, row in zip(face_ids, values)
+        ]
+        for meta, (area, cx, cy, cz, nx, ny, nz, *bounds) in zip(
+            metadata, np.round(values, 4).tolist()
+        ):
+            meta["area"] = area
+            meta["centroid"] = [cx, cy, cz]
+            meta["normal"] = [nx, ny, nz]
+            meta["bounds"] = bounds
+        return metadata
+
+    def _extract_face_metadata(self, face, face_id, props, bbox, values):
+        """Extract geometric metadata from a TopoDS_Face.
+
+        The unrounded area, centroid, normal and bounds are written into the values row
+        (see FACE_VALUE_COLUMNS) for the caller to round and fill in. props and bbox are
+        reused between calls; both are reset before use.
+        """
         # Surface type
         adaptor = BRepAdaptor_Surface(face)
         surface_type = SURFACE_TYPE_NAMES.get(adaptor.GetType(), "other")
 
-        # Area
-        props = GProp_GProps()
+        # Area and centroid (SurfaceProperties reinitialises props)
         BRepGProp.SurfaceProperties_s(face, props)
-        area = props.Mass()
-
-        # Centroid
+        values[0] = props.Mass()
         centroid = props.CentreOfMass()
-        cx, cy, cz = centroid.X(), centroid.Y(), centroid.Z()
+        values[1:4] = centroid.X(), centroid.Y(), centroid.Z()
 
-        # Bounding box
-        bbox = Bnd_Box()
-        BRepBndLib.Add_s(face, bbox)
-        xmin, ymin, zmin, xmax, ymax, zmax = bbox.Get()
-
-        # Normal (average for the face, sampled at centroid UV)
-        normal = [0, 0, 0]
+        # Normal (average for the face, sampled at centroid UV); zero unless planar
         if surface_type == "planar":
             plane = adaptor.Plane()
             axis = plane.Axis().Direction()
+            values[4:7] = axis.X(), axis.Y(), axis.Z()
             # Check face orientation
             if face.Orientation() == 1:  # TopAbs_REVERSED
-                normal = [-axis.X(), -axis.Y(), -axis.Z()]
-            else:
-                normal = [axis.X(), axis.Y(), axis.Z()]
+                values[4:7] *= -1
+
+        # Bounding box from the geometry, never the triangulation: metadata may be
+        # extracted lazily after meshing, and bounds must not depend on call order
+        bbox.SetVoid()
+        BRepBndLib.Add_s(face, bbox, False)
+        values[7:13] = bbox.Get()
 
         # Cylinder-specific properties
         radius = None
@@ -215,10 +586,11 @@ class StepProcessor:
             cylinder = adaptor.Cylinder()
             radius = round(cylinder.Radius(), 4)
             cyl_axis = cylinder.Axis()
+            axis_dir = cyl_axis.Direction()
             axis_direction = [
-                round(cyl_axis.Direction().X(), 4),
-                round(cyl_axis.Direction().Y(), 4),
-                round(cyl_axis.Direction().Z(), 4),
+                round(axis_dir.X(), 4),
+                round(axis_dir.Y(), 4),
+                round(axis_dir.Z(), 4),
             ]
             axis_loc = cyl_axis.Location()
             axis_point = [
@@ -234,13 +606,10 @@ class StepProcessor:
         return {
             "id": face_id,
             "surface_type": surface_type,
-            "area": round(area, 4),
-            "centroid": [round(cx, 4), round(cy, 4), round(cz, 4)],
-            "normal": [round(n, 4) for n in normal],
-            "bounds": [
-                round(xmin, 4), round(ymin, 4), round(zmin, 4),
-                round(xmax, 4), round(ymax, 4), round(zmax, 4)
-            ],
+            "area": None,
+            "centroid": None,
+            "normal": None,
+            "bounds": None,
             "radius": radius,
             "axis_direction": axis_direction,
             "axis_point": axis_point,
@@ -250,124 +619,66 @@ class StepProcessor:
             "feature": None,
         }
 
+    def face_entity_index(self, face_id):
+        """Index into the face_entity_* columns for an OCC face, or None if it has no entity.
+
+        OCC reads faces in the same order as ADVANCED_FACE entities appear in the STEP
+        file, so this is the identity; override it where that order diverges (e.g.
+        assemblies with instanced sub-shapes).
+        """
+        if 0 <= face_id < len(self.face_entity_names):
+            return face_id
+        return None
+
     def _get_step_name(self, face_id):
         """Get the existing name from the STEP file for a face, if any."""
-        if face_id < len(self.advanced_face_lines):
-            name = self.advanced_face_lines[face_id]["name"]
+        index = self.face_entity_index(face_id)
+        if index is not None:
+            name = self.face_entity_names[index]
             # Return None if name is empty or 'NONE' (common default)
             if name and name.upper() != "NONE":
                 return name
         return None
 
-    def tessellate(self, linear_deflection=0.1, angular_deflection=0.5):
-        """
-        Tessellate all faces and return mesh data with face-index mapping.
-        Returns dict with vertices, triangles, normals, and face_ids arrays.
+    def _mesh_shape(self, linear_deflection, angular_deflection):
+        """Run OCC's incremental mesher over the entire shape, meshing faces in parallel.
+
+        Skipped when the shape is already meshed at these deflections, or when it
+        arrives with a triangulation at least as fine (e.g. embedded in the STEP file).
         """
-        if self.shape is None:
-            raise ValueError("No STEP file loaded")
+        shape = self.shape.wrapped
+        if self._mesh_params == (linear_deflection, angular_deflection):
+            return
+        if self._mesh_params is not None:
+            # Drop the old triangulation, or the mesher would keep finer faces as they are
+            BRepTools.Clean_s(shape)
+        elif BRepTools.Triangulation_s(shape, linear_deflection):
+            self._mesh_params = (linear_deflection, angular_deflection)
+            return
 
-        # Mesh the entire shape
-        mesh = BRepMesh_IncrementalMesh(
-            self.shape.wrapped, linear_deflection, False, angular_deflection, True
-        )
-        mesh.Perform()
-
-        all_vertices = []
-        all_normals = []
-        all_triangles = []
-        all_face_ids = []  # One entry per triangle, maps to face index
-        vertex_offset = 0
-
-        for face_id, face in enumerate(self.faces):
-            location = TopLoc_Location()
-            triangulation = BRep_Tool.Triangulation_s(face, location)
-
-            if triangulation is None:
-                continue
-
-            trsf = location.Transformation()
-            num_verts = triangulation.NbNodes()
-            num_tris = triangulation.NbTriangles()
-
-            # Extract vertices
-            for i in range(1, num_verts + 1):
-                node = triangulation.Node(i)
-                node.Transform(trsf)
-                all_vertices.extend([node.X(), node.Y(), node.Z()])
-
-            # Extract normals if available
-            if triangulation.HasNormals():
-                for i in range(1, num_verts + 1):
-                    normal = triangulation.Normal(i)
-                    if face.Orientation() == 1:  # Reversed
-                        all_normals.extend([-normal.X(), -normal.Y(), -normal.Z()])
-                    else:
-                        all_normals.extend([normal.X(), normal.Y(), normal.Z()])
-            else:
-                # Compute normals from triangles for this face
-                # First collect all vertices for this face
-                face_verts = []
-                for i in range(1, num_verts + 1):
-                    node = triangulation.Node(i)
-                    node.Transform(trsf)
-                    face_verts.append([node.X(), node.Y(), node.Z()])
-
-                # Compute per-vertex normals by averaging adjacent triangle normals
-                vertex_normals = [[0, 0, 0] for _ in range(num_verts)]
-                for i in range(1, num_tris + 1):
-                    tri = triangulation.Triangle(i)
-                    n1, n2, n3 = tri.Get()
-                    v0 = face_verts[n1 - 1]
-                    v1 = face_verts[n2 - 1]
-                    v2 = face_verts[n3 - 1]
-                    # Compute triangle normal
-                    e1 = [v1[j] - v0[j] for j in range(3)]
-                    e2 = [v2[j] - v0[j] for j in range(3)]
-                    n = [
-                        e1[1] * e2[2] - e1[2] * e2[1],
-                        e1[2] * e2[0] - e1[0] * e2[2],
-                        e1[0] * e2[1] - e1[1] * e2[0],
-                    ]
-                    # Accumulate to each vertex
-                    for idx in [n1 - 1, n2 - 1, n3 - 1]:
-                        vertex_normals[idx] = [vertex_normals[idx][j] + n[j] for j in range(3)]
-
-                # Normalize and add
-                for vn in vertex_normals:
-                    length = (vn[0]**2 + vn[1]**2 + vn[2]**2) ** 0.5
-                    if length > 0:
-                        vn = [vn[j] / length for j in range(3)]
-                    else:
-                        vn = [0, 0, 1]  # Fallback
-                    if face.Orientation() == 1:  # Reversed
-                        all_normals.extend([-vn[0], -vn[1], -vn[2]])
-                    else:
-                        all_normals.extend(vn)
-
-            # Extract triangles with correct winding
-            for i in range(1, num_tris + 1):
-                tri = triangulation.Triangle(i)
-                n1, n2, n3 = tri.Get()
-                # Adjust for face orientation
-                if face.Orientation() == 1:  # Reversed
-                    all_triangles.extend([
-                        n1 - 1 + vertex_offset,
-                        n3 - 1 + vertex_offset,
-                        n2 - 1 + vertex_offset,
-                    ])
-                else:
-                    all_triangles.extend([
-                        n1 - 1 + vertex_offset,
-                        n2 - 1 + vertex_offset,
-                        n3 - 1 + vertex_offset,
-                    ])
-                all_face_ids.append(face_id)
+        params = IMeshTools_Parameters()
+        params.Deflection = linear_deflection
+        params.Angle = angular_deflection
+        params.Relative = False
+        params.InParallel = True
+        # The constructor performs the meshing
+        BRepMesh_IncrementalMesh(shape, params)
+        self._mesh_params = (linear_deflection, angular_deflection)
 
-            vertex_offset += num_verts
+    def _iter_face_meshes(self):
+        """Yield (face_id, verts, normals, tris) for every face that has a triangulation.
 
-        # Extract topological edges
-        edge_vertices = []
+        Faces are visited in mesh_face_order().
+        """
+        triangulation_cache = {}
+        for face_id in self.mesh_face_order().tolist():
+            face_mesh = _face_mesh(self.faces[face_id], triangulation_cache)
+            if face_mesh is not None:
+                yield (face_id, *face_mesh)
+
+    def _edge_vertices(self, linear_deflection, angular_deflection):
+        """Discretize CAD topological edges into a flat array of segment endpoints."""
+        edge_segments = []
         edge_explorer = TopExp_Explorer(self.shape.wrapped, TopAbs_EDGE)
         while edge_explorer.More():
             edge = TopoDS.Edge_s(edge_explorer.Current())
@@ -379,36 +690,138 @@ class StepProcessor:
                 )
                 num_points = discretizer.NbPoints()
                 if num_points >= 2:
-                    for i in range(1, num_points):
-                        p1 = discretizer.Value(i)
-                        p2 = discretizer.Value(i + 1)
-                        edge_vertices.extend([
-                            p1.X(), p1.Y(), p1.Z(),
-                            p2.X(), p2.Y(), p2.Z()
-                        ])
+                    points = np.array([
+                        (p.X(), p.Y(), p.Z())
+                        for p in map(discretizer.Value, range(1, num_points + 1))
+                    ], dtype=np.float32)
+                    # Polyline p0 p1 p2 ... -> segment endpoints p0 p1 p1 p2 ...
+                    edge_segments.append(np.repeat(points, 2, axis=0)[1:-1])
             except Exception:
                 pass  # Skip edges that can't be discretized
             edge_explorer.Next()
 
-        return {
-            "vertices": all_vertices,
-            "normals": all_normals,
-            "triangles": all_triangles,
-            "face_ids": all_face_ids,
-            "num_faces": len(self.faces),
-            "edges": edge_vertices,
-        }
+        if not edge_segments:
+            return np.empty(0, dtype=np.float32)
+        return np.concatenate(edge_segments).ravel()
+
+    def tessellate(self, linear_deflection=0.1, angular_deflection=0.5):
+        """
+        Tessellate all faces and return mesh data with face-index mapping.
+        Returns dict of base64-encoded buffers: vertices quantized to Uint16 (rebuilt
+        as q * scale + offset), oct-encoded Int8 normal pairs, Uint32 triangles and
+        face_ids, and Float32 edges.
+        """
+        if self.shape is None:
+            raise ValueError("No STEP file loaded")
+
+        with self._mesh_lock:
+            self._mesh_shape(linear_deflection, angular_deflection)
+            mesh_data = _encode_mesh(*_combine_face_meshes(self._iter_face_meshes()))
+        mesh_data["num_faces"] = len(self.faces)
+        mesh_data["edges_b64"] = _encode_array(
+            self._edge_vertices(linear_deflection, angular_deflection), "<f4"
+        )
+        return mesh_data
+
+    def iter_mesh_batches(self, linear_deflection=0.1, angular_deflection=0.5,
+                          batch_triangles=MESH_BATCH_TRIANGLES):
+        """
+        Tessellate progressively, yielding the mesh in batches of whole faces.
+
+        Each batch has the same buffers as tessellate(), with triangle indices relative
+        to the batch's own vertices. The last batch also carries edges_b64. Completed
+        runs are memoized, so repeat calls with the same parameters replay the batches.
+
+        The mesh lock is held until the run completes or the generator is closed, so a
+        concurrent caller waits and then replays the memoized batches.
+        """
+        if self.shape is None:
+            raise ValueError("No STEP file loaded")
+
+        params = (linear_deflection, angular_deflection, batch_triangles)
+        with self._mesh_lock:
+            if self._mesh_batches is not None and self._mesh_batches[0] == params:
+                batches = self._mesh_batches[1]
+            else:
+                batches = None
+                yield from self._build_mesh_batches(params)
+        # Replay outside the lock; memoized batches are never modified
+        if batches is not None:
+            yield from batches
+
+    def _build_mesh_batches(self, params):
+        """Mesh the shape and yield fresh batches for iter_mesh_batches(); needs the mesh lock."""
+        linear_deflection, angular_deflection, batch_triangles = params
+        self._mesh_shape(linear_deflection, angular_deflection)
+
+        # Quantize every batch over the whole shape's box so shared edges line up
+        bbox = Bnd_Box()
+        BRepBndLib.Add_s(self.shape.wrapped, bbox)
+        bounds = None if bbox.IsVoid() else np.array(bbox.Get()).reshape(2, 3)
+
+        batches = []
+        pending = []
+        pending_triangles = 0
+        for face_mesh in self._iter_face_meshes():
+            pending.append(face_mesh)
+            pending_triangles += len(face_mesh[3])
+            if pending_triangles >= batch_triangles:
+                batch = _encode_mesh(*_combine_face_meshes(pending), bounds=bounds)
+                batch["num_faces"] = len(self.faces)
+                batches.append(batch)
+                yield batch
+                pending = []
+                pending_triangles = 0
+
+        # Final batch: remaining faces (possibly none) plus the CAD edges
+        batch = _encode_mesh(*_combine_face_meshes(pending), bounds=bounds)
+        batch["num_faces"] = len(self.faces)
+        batch["edges_b64"] = _encode_array(
+            self._edge_vertices(linear_deflection, angular_deflection), "<f4"
+        )
+        batches.append(batch)
+        yield batch
+
+        self._mesh_batches = (params, batches)
+
+    def mesh_face_order(self):
+        """Face ids in Morton order of their centroids, the order faces are meshed in.
+
+        Spatially close faces land in the same stream batch and neighbouring buffer
+        ranges. Face ids themselves are unchanged.
+        """
+        if self._mesh_face_order is None:
+            faces = self.get_faces_metadata()
+            centroids = np.array([meta["centroid"] for meta in faces]).reshape(-1, 3)
+            self._mesh_face_order = np.argsort(_morton_codes(centroids), kind="stable")
+        return self._mesh_face_order
 
     def get_faces_metadata(self):
-        """Return metadata for all faces."""
+        """Return metadata for all faces, extracting any not yet computed."""
+        self._ensure_face_metadata(range(len(self.faces)))
         return self.face_metadata
 
     def get_face_metadata(self, face_id):
         """Return metadata for a specific face."""
         if 0 <= face_id < len(self.face_metadata):
+            self._ensure_face_metadata([face_id])
             return self.face_metadata[face_id]
         return None
 
+    def get_faces_json(self):
+        """Return serialized JSON bytes of {"faces": [...]} for all faces, cached per load."""
+        if self._faces_json_cache is None:
+            self._faces_json_cache = orjson.dumps({"faces": self.get_faces_metadata()})
+        return self._faces_json_cache
+
+    def get_face_json(self, face_id):
+        """Return serialized JSON bytes of a specific face's metadata, cached per load."""
+        if 0 <= face_id < len(self._face_json_cache):
+            if self._face_json_cache[face_id] is None:
+                self._face_json_cache[face_id] = orjson.dumps(self.get_face_metadata(face_id))
+            return self._face_json_cache[face_id]
+        return None
+
     def export_named_step(self, features, output_path):
         """
         Export STEP file with named ADVANCED_FACE entities.
@@ -439,35 +852,39 @@ class StepProcessor:
                     full_name = feature_name
                 face_name_map[face_id] = full_name
 
-        # Match face indices to STEP entity indices
-        # OCC reads faces in the same order as ADVANCED_FACE entities appear in STEP
+        # Match face indices to STEP entity indices via face_entity_index()
         # This mapping is the critical bridge
         content = self.step_content
 
-        # Replace names in reverse order to preserve positions
+        # Collect (position, old_text, new_text) edits to splice into the content
         replacements = []
         for face_id, name in face_name_map.items():
-            if face_id < len(self.advanced_face_lines):
-                entity = self.advanced_face_lines[face_id]
-                old_text = entity["match_text"]
+            index = self.face_entity_index(face_id)
+            if index is not None:
+                start = int(self.face_entity_starts[index])
+                old_text = content[start:int(self.face_entity_ends[index])]
                 # Build new text with the name replaced
-                new_text = re.sub(
-                    r"'[^']*'",
-                    f"'{name}'",
-                    old_text,
-                    count=1
-                )
-                replacements.append((entity["start_pos"], old_text, new_text))
+                # (a callable replacement keeps backslashes in names literal)
+                quoted_name = f"'{name}'".encode("utf-8")
+                new_text = _FIRST_QUOTED_RE.sub(lambda _: quoted_name, old_text, count=1)
+                replacements.append((start, old_text, new_text))
 
-        # Sort by position descending so replacements don't shift positions
-        replacements.sort(key=lambda x: x[0], reverse=True)
+        # Sort by position and stream the output in a single forward pass, copying
+        # unchanged spans straight from the mapped input (no full-size copy in memory)
+        replacements.sort(key=lambda x: x[0])
 
-        for pos, old_text, new_text in replacements:
-            content = content[:pos] + new_text + content[pos + len(old_text):]
-
-        # Write output
         output_path = Path(output_path)
-        with open(output_path, 'w') as f:
-            f.write(content)
+        with open(output_path, 'wb') as f:
+            view = memoryview(content)
+            try:
+                cursor = 0
+                for pos, old_text, new_text in replacements:
+                    f.write(view[cursor:pos])
+                    f.write(new_text)
+                    cursor = pos + len(old_text)
+                f.write(view[cursor:])
+            finally:
+                # An outstanding export on the mmap would block close() on reload
+                view.release()
 
         return str(output_path)